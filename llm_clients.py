@@ -0,0 +1,58 @@
+import os
+from functools import cache
+
+import httpx
+from langchain_openai import ChatOpenAI
+from langchain_ollama import ChatOllama
+from dotenv import load_dotenv
+
+load_dotenv()
+OPEN_AI_API_KEY = os.getenv("OPENAI_API_KEY")
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
+
+# One connection pool per provider, shared by the tools and the agents
+HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
+
+
+def is_valid_openai_key(key: str) -> bool:
+    return bool(key) and not key.startswith("your_ope")
+
+
+@cache
+def get_openai():
+    """Return the shared OpenAI chat model, or None if no valid key is configured."""
+    if is_valid_openai_key(OPEN_AI_API_KEY):
+        try:
+            return ChatOpenAI(
+                model="gpt-4", temperature=0, openai_api_key=OPEN_AI_API_KEY,
+                http_client=httpx.Client(limits=HTTP_LIMITS),
+                http_async_client=httpx.AsyncClient(limits=HTTP_LIMITS),
+            )
+        except Exception as e:
+            print(f"OpenAI failed: {e}")
+    return None
+
+
+@cache
+def get_ollama():
+    """Return the shared Ollama chat model, or None if OLLAMA_BASE_URL is not set."""
+    if OLLAMA_BASE_URL:
+        try:
+            return ChatOllama(
+                model="llama3.2", base_url=OLLAMA_BASE_URL, temperature=0,
+                client_kwargs={"limits": HTTP_LIMITS},
+            )
+        except Exception as e:
+            print(f"Ollama failed: {e}")
+    return None
+
+
+def get_llm():
+    """Return the primary LLM: OpenAI (if a valid key is present) or fallback to Ollama."""
+    openai = get_openai()
+    return openai if openai is not None else get_ollama()
+
+
+def get_fallback_llm():
+    """Return the Ollama LLM used to back up OpenAI, or None when Ollama is already primary."""
+    return get_ollama() if get_openai() is not None else None
@@ -1,28 +1,32 @@
 import asyncio
+import codecs
+import html
+import io
 import time
 import os
+import re
 import logging
-from functools import lru_cache
 
-from fastapi import FastAPI, UploadFile
-from fastapi.responses import HTMLResponse
+from fastapi import FastAPI, Request, UploadFile
+from fastapi.responses import HTMLResponse, StreamingResponse
 from dotenv import load_dotenv
 from langchain.agents import initialize_agent, AgentType
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama
+from langchain.agents.mrkl.output_parser import MRKLOutputParser
+from langchain_core.agents import AgentFinish
+from langchain_core.exceptions import OutputParserException
 
+from llm_clients import get_openai, get_ollama
 from tools import (
     check_build_status, extract_error_lines, suggest_fixes, explain_yml,
     check_tf_issues, generate_pr_text, summarize_log, lint_python_files,
     check_dockerfile_security, scan_for_secrets, check_dependency_vulnerabilities,
     check_yaml_json_syntax, detect_slow_tests, extract_failed_tests,
-    detect_deprecated_warnings
+    detect_deprecated_warnings, analyze_log_bundle, hedged,
+    run_build_log_tools, run_line_log_tools, iter_log_lines, run_all_fs_findings_async, format_fs_results, clear_scan_cache, FS_CHECKS, EMPTY_RESULTS, _json_dumps
 )
 
 # Load .env variables
 load_dotenv()
-OPEN_AI_API_KEY = os.getenv("OPENAI_API_KEY")
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
 
 # Logger setup
 logging.basicConfig(level=logging.INFO)
@@ -30,7 +34,12 @@ logger = logging.getLogger(__name__)
 
 # Constants
 PROJECT_ROOT = "."
-EXCLUDED_DIRS = {'.git', 'venv', '__pycache__', 'node_modules'}
+LOG_CHUNK_SIZE = 1 << 20
+AGENT_HEDGE_DELAY = float(os.getenv("AGENT_HEDGE_DELAY", "60"))
+SUMMARY_RESULT_CHARS = 4000
+SUMMARY_MAX_FINDINGS = 20
+# A ReAct reasoning step, which is not an answer on its own
+THOUGHT_RE = re.compile(r"^\s*Thought\s*:", re.MULTILINE)
 
 # All tools
 tools = [
@@ -41,39 +50,57 @@ tools = [
     detect_deprecated_warnings
 ]
 
-# Validate OpenAI key
-def is_valid_openai_key(key: str) -> bool:
-    return key and not key.startswith("your_ope")
+class RepairingOutputParser(MRKLOutputParser):
+    """ReAct parser that salvages malformed answers instead of sending them back to the LLM."""
+
+    def parse(self, text: str):
+        try:
+            return super().parse(text)
+        except OutputParserException:
+            # Plain prose without any action or reasoning step: the model has answered
+            # directly. (A final answer before a stray action is already salvaged by
+            # MRKLOutputParser itself; an action before one is never accepted.)
+            if "Action" not in text and not THOUGHT_RE.search(text):
+                return AgentFinish({"output": text.strip()}, text)
+            # A half-formed action or a bare thought; let handle_parsing_errors ask the LLM to correct it
+            raise
+
+def build_agent(llm):
+    """Initialize a LangChain agent with error handling for tool parsing."""
+    return initialize_agent(
+        tools=tools,
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        agent_kwargs={"output_parser": RepairingOutputParser()},
+        verbose=True,
+        handle_parsing_errors=True  # <-- important
+    )
 
-# Cached agent
-@lru_cache()
-def get_agent():
-    """Initialize and cache the LangChain agent with error handling for tool parsing."""
-    if is_valid_openai_key(OPEN_AI_API_KEY):
+def build_agents():
+    """Build the OpenAI (primary) and Ollama (fallback) agents; either may be None."""
+    primary_agent = fallback_agent = None
+    if (openai := get_openai()) is not None:
         try:
-            llm = ChatOpenAI(model="gpt-4", temperature=0, openai_api_key=OPEN_AI_API_KEY)
-            return initialize_agent(
-                tools=tools,
-                llm=llm,
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=True,
-                handle_parsing_errors=True  # <-- important
-            )
+            primary_agent = build_agent(openai)
         except Exception as e:
             logger.warning(f"⚠️ OpenAI failed: {e}")
-    if OLLAMA_BASE_URL:
+    if (ollama := get_ollama()) is not None:
         try:
-            llm = ChatOllama(model="llama3.2", base_url=OLLAMA_BASE_URL, temperature=0)
-            return initialize_agent(
-                tools=tools,
-                llm=llm,
-                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-                verbose=True,
-                handle_parsing_errors=True  # <-- important
-            )
+            fallback_agent = build_agent(ollama)
         except Exception as e:
             logger.error(f"⚠️ Ollama failed: {e}")
-    raise RuntimeError("❌ No valid LLM available")
+    return primary_agent, fallback_agent
+
+async def run_agent(state, prompt: str) -> str:
+    """Run a prompt on the primary agent, hedging on the Ollama agent if it is slow or fails."""
+    # A new session: the agent's filesystem tools list the project tree afresh
+    clear_scan_cache()
+    agents = [a for a in (state.primary_agent, state.fallback_agent) if a is not None]
+    if not agents:
+        raise RuntimeError("❌ No valid LLM available")
+    primary, *rest = agents
+    secondary = (lambda: rest[0].arun(prompt)) if rest else None
+    return await hedged(primary.arun(prompt), secondary, AGENT_HEDGE_DELAY)
 
 # FastAPI app
 app = FastAPI(
@@ -82,118 +109,186 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Agents are built once per process and shared by all requests
+@app.on_event("startup")
+def init_agents():
+    app.state.primary_agent, app.state.fallback_agent = build_agents()
+
+async def stream_agent(state, prompt: str):
+    """Stream agent chunks from the primary agent, falling back to the Ollama agent if it fails before producing any."""
+    agents = [a for a in (state.primary_agent, state.fallback_agent) if a is not None]
+    if not agents:
+        raise RuntimeError("❌ No valid LLM available")
+    for i, agent in enumerate(agents):
+        started = False
+        try:
+            async for chunk in agent.astream({"input": prompt}):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or i == len(agents) - 1:
+                raise
+            logger.warning(f"⚠️ Primary agent failed, falling back: {e}")
+
 # HTML Formatter
-def format_html_report(tool_results, summary):
-    def format_llm_output(result):
-        if isinstance(result, dict) and "content" in result:
-            content = result.get("content", "").strip()
-            model = result.get("response_metadata", {}).get("model_name", "Unknown")
-            input_tokens = result.get("usage_metadata", {}).get("input_tokens", 0)
-            output_tokens = result.get("usage_metadata", {}).get("output_tokens", 0)
-            total_tokens = result.get("usage_metadata", {}).get("total_tokens", 0)
-            return f"""
-                <div>
-                    <p><strong>Model:</strong> {model}</p>
-                    <p><strong>Tokens Used:</strong> input={input_tokens}, output={output_tokens}, total={total_tokens}</p>
-                    <pre>{content}</pre>
-                </div>
-            """
-        elif isinstance(result, str):
-            return f"<pre>{result.strip()}</pre>"
-        else:
-            return f"<pre>{str(result).strip()}</pre>"
-
-    html = [
-        '<html><head><style>',
-        'body { font-family: Arial, sans-serif; }',
-        'h2, h3 { color: #333; }',
-        'table { border-collapse: collapse; width: 100%; }',
-        'th, td { border: 1px solid #ccc; padding: 8px; text-align: left; vertical-align: top; }',
-        'th { background-color: #f2f2f2; }',
-        'pre { white-space: pre-wrap; word-break: break-word; font-size: 14px; }',
-        '</style></head><body>'
-    ]
-
-    html.append('<h2>🤖 AI Agent Analysis</h2>')
-    html.append('<h3>Summary</h3>')
-    html.append(format_llm_output(summary))
-
-    html.append('<h3>Tool Results</h3>')
-    html.append('<table><tr><th>Tool</th><th>Result</th></tr>')
-    for tool, result in tool_results.items():
-        html.append(f'<tr><td><b>{tool}</b></td><td>{format_llm_output(result)}</td></tr>')
-    html.append('</table></body></html>')
+REPORT_HEAD = '\n'.join([
+    '<html><head><style>',
+    'body { font-family: Arial, sans-serif; }',
+    'h2, h3 { color: #333; }',
+    'table { border-collapse: collapse; width: 100%; }',
+    'th, td { border: 1px solid #ccc; padding: 8px; text-align: left; vertical-align: top; }',
+    'th { background-color: #f2f2f2; }',
+    'pre { white-space: pre-wrap; word-break: break-word; font-size: 14px; }',
+    '</style></head><body>',
+    '<h2>🤖 AI Agent Analysis</h2>',
+    ''
+])
+REPORT_FOOT = '</body></html>'
+TOOL_TABLE_HEAD = '<h3>Tool Results</h3>\n<table><tr><th>Tool</th><th>Result</th></tr>\n'
+
+def format_llm_output(result):
+    if isinstance(result, dict) and "content" in result:
+        content = result.get("content", "").strip()
+        model = result.get("response_metadata", {}).get("model_name", "Unknown")
+        input_tokens = result.get("usage_metadata", {}).get("input_tokens", 0)
+        output_tokens = result.get("usage_metadata", {}).get("output_tokens", 0)
+        total_tokens = result.get("usage_metadata", {}).get("total_tokens", 0)
+        return f"""
+            <div>
+                <p><strong>Model:</strong> {html.escape(str(model))}</p>
+                <p><strong>Tokens Used:</strong> input={input_tokens}, output={output_tokens}, total={total_tokens}</p>
+                <pre>{html.escape(content)}</pre>
+            </div>
+        """
+    elif isinstance(result, str):
+        return f"<pre>{html.escape(result.strip())}</pre>"
+    else:
+        return f"<pre>{html.escape(str(result).strip())}</pre>"
+
+def format_agent_chunk(chunk) -> str:
+    """Render one streamed agent chunk: its reasoning steps and, at the end, the final answer."""
+    parts = [f"<pre>{html.escape(action.log.strip())}</pre>" for action in chunk.get("actions", [])]
+    if "output" in chunk:
+        parts.append(f"<pre>{html.escape(str(chunk['output']).strip())}</pre>")
+    return '\n'.join(parts) + '\n' if parts else ''
 
-    return '\n'.join(html)
+def format_tool_results(tool_results) -> str:
+    """Render the tool results table, escaping every tool output."""
+    buf = io.StringIO()
+    w = buf.write
+    w(TOOL_TABLE_HEAD)
+    for tool, result in tool_results.items():
+        w(f'<tr><td><b>{html.escape(tool)}</b></td><td>{format_llm_output(result)}</td></tr>\n')
+    w('</table>\n')
+    return buf.getvalue()
 
 # Test endpoint
 @app.get("/test")
-def test_agent():
+async def test_agent(request: Request):
     try:
-        agent = get_agent()
-        result = agent.run("What is 2 + 2?")
+        result = await run_agent(request.app.state, "What is 2 + 2?")
         return {"response": result}
     except Exception as e:
         logger.exception("Agent test failed")
         return {"error": str(e)}
 
+async def read_log(log: UploadFile) -> str:
+    """Decode an uploaded log chunk by chunk so its raw bytes are never buffered whole."""
+    # No isascii()/latin-1 shortcut: CPython's UTF-8 decoder already copies pure-ASCII
+    # input at memcpy speed, and the extra isascii() scan plus latin-1 decode is slower
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    parts = []
+    while chunk := await log.read(LOG_CHUNK_SIZE):
+        parts.append(decoder.decode(chunk))
+    parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)
+
+async def run_tools(decoded_log: str, no_cache: bool = False) -> tuple[dict, dict]:
+    """Run every log and directory tool, fanning out everything that can run concurrently.
+
+    Returns the text result of every tool and the structured findings of the directory tools.
+    """
+    tool_results = {}
+
+    # Build status and error lines come from one pass; the error lines feed the suggest_fixes prompt
+    # (off the event loop: a multi-MB log takes a while to scan)
+    tool_results.update(await asyncio.to_thread(run_build_log_tools, decoded_log))
+    errors = tool_results["extract_error_lines"]
+
+    # Directory-based tools share one walk of the project tree
+    async def run_fs_tools():
+        try:
+            findings = await run_all_fs_findings_async(PROJECT_ROOT)
+        except Exception as e:
+            return {name: f"Error: {e}" for name in FS_CHECKS}, {}
+        return format_fs_results(findings), findings
+
+    # Fan out everything that does not depend on another tool's output
+    llm_results, line_results, (dir_results, fs_findings) = await asyncio.gather(
+        analyze_log_bundle(decoded_log, errors, use_cache=not no_cache),
+        # The remaining line-based tools share one lazy pass over the log's lines
+        asyncio.to_thread(run_line_log_tools, iter_log_lines(decoded_log)),
+        run_fs_tools(),
+    )
+    tool_results.update(line_results)
+    tool_results.update(llm_results)
+    tool_results.update(dir_results)
+    return tool_results, fs_findings
+
+def clip(text: str, limit: int = SUMMARY_RESULT_CHARS) -> str:
+    """Keep the head and tail of a long text, dropping the middle."""
+    if len(text) <= limit:
+        return text
+    return text[:limit // 2] + "\n...[truncated]...\n" + text[-(limit // 2):]
+
+def compact_findings(findings: list, limit: int = SUMMARY_MAX_FINDINGS) -> str:
+    """Render the first findings as compact JSON, counting the rest instead of listing them."""
+    shown = [{k: v for k, v in f.items() if v is not None and k != "kind"} for f in findings[:limit]]
+    if len(findings) > limit:
+        shown.append({"more": len(findings) - limit})
+    return _json_dumps(shown).decode()
+
+def build_summary_prompt(tool_results: dict, fs_findings: dict | None = None) -> str:
+    """Compose the agent prompt from compact tool outputs, skipping tools with nothing to report.
+
+    Directory tools are given as their first findings in compact JSON; other outputs are clipped.
+    """
+    fs_findings = fs_findings or {}
+    compact = {}
+    for tool, result in tool_results.items():
+        if tool in fs_findings:
+            if fs_findings[tool]:
+                compact[tool] = compact_findings(fs_findings[tool])
+            continue
+        text = result["content"] if isinstance(result, dict) else str(result)
+        if text.strip() not in EMPTY_RESULTS:
+            compact[tool] = clip(text)
+    return f"Given the following tool results, provide a detailed analysis and suggest a fix:\n{compact}"
+
 # Log analysis endpoint
 @app.post("/analyze/", response_class=HTMLResponse)
-async def analyze(log: UploadFile):
+async def analyze(request: Request, log: UploadFile, no_cache: bool = False):
     start = time.time()
-    log_content = await log.read()
-    decoded_log = log_content.decode(errors="ignore")
-    agent = get_agent()
-    tool_results = {}
+    decoded_log = await read_log(log)
+    state = request.app.state
 
-    async def run_tool(tool, args):
+    # Stream the report: the page header goes out at once and the summary as the agent works
+    async def generate():
+        yield REPORT_HEAD
+        # A new session: list the project tree afresh (results are still reused if it is unchanged)
+        clear_scan_cache()
+        tool_results, fs_findings = await run_tools(decoded_log, no_cache)
+
+        yield '<h3>Summary</h3>\n'
         try:
-            return await asyncio.to_thread(tool.invoke, args)
+            async for chunk in stream_agent(state, build_summary_prompt(tool_results, fs_findings)):
+                yield format_agent_chunk(chunk)
         except Exception as e:
-            return f"Error: {e}"
-
-    # Run log-based tools
-    log_tasks = {
-        "check_build_status": run_tool(check_build_status, {"log": decoded_log}),
-        "extract_error_lines": run_tool(extract_error_lines, {"log": decoded_log}),
-        "summarize_log": run_tool(summarize_log, {"log": decoded_log}),
-        "explain_yml": run_tool(explain_yml, {"content": decoded_log}),
-        "check_tf_issues": run_tool(check_tf_issues, {"tf_file": decoded_log}),
-        "detect_slow_tests": run_tool(detect_slow_tests, {"log": decoded_log}),
-        "extract_failed_tests": run_tool(extract_failed_tests, {"log": decoded_log}),
-        "detect_deprecated_warnings": run_tool(detect_deprecated_warnings, {"log": decoded_log}),
-    }
-    log_results = await asyncio.gather(*log_tasks.values())
-    tool_results.update(dict(zip(log_tasks.keys(), log_results)))
-
-    # LLM-based follow-ups
-    errors = tool_results.get("extract_error_lines", "")
-    fix_summary = await run_tool(suggest_fixes, {"errors": errors})
-    tool_results["suggest_fixes"] = fix_summary
-
-    pr_text = await run_tool(generate_pr_text, {"fix_summary": fix_summary if isinstance(fix_summary, str) else ""})
-    tool_results["generate_pr_text"] = pr_text
-
-    # Directory-based tools
-    dir_tasks = {
-        "lint_python_files": run_tool(lint_python_files, {"root_dir": PROJECT_ROOT}),
-        "check_dockerfile_security": run_tool(check_dockerfile_security, {"root_dir": PROJECT_ROOT}),
-        "scan_for_secrets": run_tool(scan_for_secrets, {"root_dir": PROJECT_ROOT}),
-        "check_dependency_vulnerabilities": run_tool(check_dependency_vulnerabilities, {"root_dir": PROJECT_ROOT}),
-        "check_yaml_json_syntax": run_tool(check_yaml_json_syntax, {"root_dir": PROJECT_ROOT}),
-    }
-    dir_results = await asyncio.gather(*dir_tasks.values())
-    tool_results.update(dict(zip(dir_tasks.keys(), dir_results)))
+            yield f"<pre>LLM summarization failed: {html.escape(str(e))}</pre>\n"
 
-    try:
-        summary_result = await asyncio.to_thread(agent.run, f"Given the following tool results, provide a detailed analysis and suggest a fix:\n{tool_results}")
-        summary = {
-            "content": str(summary_result),
-            "response_metadata": getattr(summary_result, "response_metadata", {}),
-            "usage_metadata": getattr(summary_result, "usage_metadata", {})
-        }
-    except Exception as e:
-        summary = {"content": f"LLM summarization failed: {e}"}
+        tool_results["analysis_time"] = f"{time.time() - start:.2f} seconds"
+        yield format_tool_results(tool_results)
+        yield REPORT_FOOT
 
-    tool_results["analysis_time"] = f"{time.time() - start:.2f} seconds"
-    return format_html_report(tool_results, summary)
+    return StreamingResponse(generate(), media_type="text/html")
@@ -1,268 +1,1258 @@
 import os
 import ast
+import asyncio
+import hashlib
+import importlib.util
+import inspect
+import time
 import re
 import yaml
 import json
+import mmap
+import shutil
+import sqlite3
 import subprocess
-from langchain.tools import tool
-from langchain_openai import ChatOpenAI
-from langchain_ollama import ChatOllama
+import threading
+import weakref
+from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from functools import cache, wraps
+from itertools import repeat
+from langchain.tools import StructuredTool, tool
+from langchain_core.messages import HumanMessage, SystemMessage
 from dotenv import load_dotenv
 
+from llm_clients import get_llm, get_fallback_llm
+
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as YamlSafeLoader
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
 load_dotenv()
-OPEN_AI_API_KEY = os.getenv("OPENAI_API_KEY")
-OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL")
+LLM_HEDGE_DELAY = float(os.getenv("LLM_HEDGE_DELAY", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", "3600"))
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "256"))
+LLM_CACHE_DB = os.getenv("LLM_CACHE_DB", "")
+
+
+# Chat models are built on first use by llm_clients (and shared from then on), so
+# importing this module, e.g. in a process-pool worker, creates no HTTP clients
+# Cap in-flight LLM requests across all tools and concurrent /analyze calls: one
+# asyncio semaphore per event loop (they cannot be shared between loops) and one
+# for the synchronous tool path, which runs on worker threads
+_llm_semaphores = weakref.WeakKeyDictionary()
+_llm_sync_semaphore = threading.BoundedSemaphore(LLM_MAX_CONCURRENCY)
+# Responses keyed by prompt hash: key -> (expiry on the monotonic clock, result); looked
+# up from worker threads, so guarded by a lock
+_response_cache = OrderedDict()
+_response_cache_lock = threading.Lock()
+# Optional sqlite copy of the cache that survives restarts, opened on first use. LLM
+# calls come from the server loop and from worker threads, so one connection is shared
+# across threads and every use of it holds the lock.
+_cache_db = None
+_cache_db_lock = threading.Lock()
+# Threads that race the primary and fallback LLMs for synchronous callers, started on first use
+_hedge_pool = None
+# Run-specific noise masked out of prompts before hashing: timestamps, and trailing
+# spaces. Line breaks and indentation are kept, as they carry meaning in YAML and Terraform.
+_PROMPT_TIMESTAMP_RE = re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b")
+_PROMPT_TRAILING_SPACE_RE = re.compile(r"[ \t]+$", re.MULTILINE)
+
+
+# Static instructions are sent as the system message and the tool input as the user
+# message, so every prompt starts with a stable prefix the provider can cache; the
+# shared preamble makes that prefix common to all tools
+SYSTEM_PREFIX = "You are a DevOps assistant reviewing Jenkins CI/CD builds."
+SUGGEST_FIXES_PROMPT = "Suggest fixes for the Jenkins build errors provided by the user."
+EXPLAIN_YML_PROMPT = "Explain the Jenkins pipeline YAML file provided by the user."
+CHECK_TF_ISSUES_PROMPT = "Check the Terraform file provided by the user for misconfigurations."
+GENERATE_PR_TEXT_PROMPT = "Create a GitHub PR title and body for the fix provided by the user."
+SUMMARIZE_LOG_PROMPT = "Summarize the Jenkins log provided by the user."
+
+
+def build_prompt(instruction: str, content: str) -> list:
+    """Build chat messages with the static instruction first and the variable input last."""
+    return [SystemMessage(content=f"{SYSTEM_PREFIX} {instruction}"), HumanMessage(content=content)]
+
+
+def _llm_result(result) -> dict:
+    """Convert a chat model response into the structured dict returned by the LLM tools."""
+    return {
+        "content": result.content if hasattr(result, "content") else str(result),
+        "response_metadata": getattr(result, "response_metadata", None) or {},
+        "usage_metadata": getattr(result, "usage_metadata", None) or {}
+    }
+
+
+def _llm_error(content: str) -> dict:
+    """Build an LLM tool result carrying only an error message."""
+    return {
+        "content": content,
+        "response_metadata": {},
+        "usage_metadata": {}
+    }
+
+
+async def hedged(primary, secondary=None, delay: float = LLM_HEDGE_DELAY):
+    """Await the `primary` coroutine, racing it against `secondary()` if it is slow or fails.
+
+    `secondary` is a zero-argument callable returning a coroutine; it is only started
+    when `primary` has not succeeded within `delay` seconds. The first successful result
+    wins and the other request is cancelled.
+    """
+    tasks = [asyncio.ensure_future(primary)]
+    try:
+        if secondary is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done or tasks[0].exception() is not None:
+                tasks.append(asyncio.ensure_future(secondary()))
+        error = None
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def _ainvoke_hedged(prompt):
+    """Invoke the primary LLM, hedging on the Ollama fallback when it is slow or fails."""
+    fallback_llm = get_fallback_llm()
+
+    def on_fallback():
+        print(f"⚠️ Primary LLM slow or failed after {LLM_HEDGE_DELAY}s, hedging on Ollama")
+        return fallback_llm.ainvoke(prompt)
+    return await hedged(get_llm().ainvoke(prompt), on_fallback if fallback_llm is not None else None)
+
+
+def _invoke_hedged_sync(prompt):
+    """Synchronous _ainvoke_hedged on the models' sync HTTP clients, for tool invoke() calls.
+
+    The slower request cannot be cancelled once sent, so it finishes in the background.
+    """
+    global _hedge_pool
+    fallback_llm = get_fallback_llm()
+    if fallback_llm is None:
+        return get_llm().invoke(prompt)
+    if _hedge_pool is None:
+        _hedge_pool = ThreadPoolExecutor(max_workers=2 * LLM_MAX_CONCURRENCY, thread_name_prefix="llm-hedge")
+    pending = {_hedge_pool.submit(get_llm().invoke, prompt)}
+    done, _ = wait(pending, timeout=LLM_HEDGE_DELAY)
+    if not done or next(iter(done)).exception() is not None:
+        print(f"⚠️ Primary LLM slow or failed after {LLM_HEDGE_DELAY}s, hedging on Ollama")
+        pending.add(_hedge_pool.submit(fallback_llm.invoke, prompt))
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _get_llm_semaphore() -> asyncio.Semaphore:
+    """Return the running event loop's LLM concurrency semaphore."""
+    loop = asyncio.get_running_loop()
+    semaphore = _llm_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _llm_semaphores[loop] = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return semaphore
 
 
-def get_llm():
-    """Initialize an LLM using OpenAI (if valid key is present) or fallback to Ollama."""
-    if OPEN_AI_API_KEY and not OPEN_AI_API_KEY.startswith("your_ope"):
+@cache
+def _llm_model_name() -> str:
+    """Name of the primary model, looked up once, so cached answers are per model."""
+    llm = get_llm()
+    return getattr(llm, "model_name", None) or getattr(llm, "model", "")
+
+
+def _normalize_prompt(text: str) -> str:
+    """Mask timestamps, CRLF line endings and trailing spaces so reruns of the same log share a cache entry."""
+    # Constant replacements keep every sub in C; a callback would call back into Python per match
+    text = _PROMPT_TIMESTAMP_RE.sub("<ts>", text).replace("\r\n", "\n")
+    return _PROMPT_TRAILING_SPACE_RE.sub("", text)
+
+
+def _cache_key(prompt) -> str:
+    """Content-address a normalized prompt, together with the model it is sent to."""
+    if isinstance(prompt, str):
+        text = prompt
+    else:
+        text = "\0".join(f"{message.type}:{message.content}" for message in prompt)
+    text = _normalize_prompt(text)
+    return hashlib.blake2b(f"{_llm_model_name()}\0{text}".encode(), digest_size=16).hexdigest()
+
+
+def _get_cache_db():
+    """Open the persistent cache database named by LLM_CACHE_DB, or return None if it is unset."""
+    global _cache_db
+    if _cache_db is None and LLM_CACHE_DB:
         try:
-            return ChatOpenAI(model="gpt-4", temperature=0, openai_api_key=OPEN_AI_API_KEY)
-        except Exception as e:
-            print(f"OpenAI failed: {e}")
-    if OLLAMA_BASE_URL:
+            _cache_db = sqlite3.connect(LLM_CACHE_DB, isolation_level=None, check_same_thread=False)
+            _cache_db.execute("PRAGMA journal_mode=WAL")
+            _cache_db.execute("PRAGMA synchronous=NORMAL")
+            _cache_db.execute("CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, expires_at REAL, result TEXT)")
+        except sqlite3.Error as e:
+            print(f"LLM cache database unavailable: {e}")
+            _cache_db = None
+    return _cache_db
+
+
+def _cache_db_get(key: str):
+    """Look a result up in the persistent cache, returning its remaining lifetime and value."""
+    with _cache_db_lock:
+        db = _get_cache_db()
+        if db is None:
+            return None
         try:
-            return ChatOllama(model="llama3.2", base_url=OLLAMA_BASE_URL, temperature=0)
-        except Exception as e:
-            print(f"Ollama failed: {e}")
-    return None
+            row = db.execute("SELECT expires_at, result FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            expires_at, result = row
+            ttl = expires_at - time.time()
+            if ttl <= 0:
+                db.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+        except sqlite3.Error as e:
+            print(f"LLM cache lookup failed: {e}")
+            return None
+    return ttl, _json_loads(result)
+
+
+def _cache_db_put(key: str, result: dict):
+    """Write a result to the persistent cache, dropping expired rows as it goes."""
+    now = time.time()
+    data = _json_dumps(result)
+    with _cache_db_lock:
+        db = _get_cache_db()
+        if db is None:
+            return
+        try:
+            db.execute("INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, now + LLM_CACHE_TTL, data))
+            db.execute("DELETE FROM llm_cache WHERE expires_at < ?", (now,))
+        except sqlite3.Error as e:
+            print(f"LLM cache write failed: {e}")
+
 
+def _cache_get(key: str):
+    """Return a cached LLM result, or None if it is missing or expired."""
+    with _response_cache_lock:
+        entry = _response_cache.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at < time.monotonic():
+                del _response_cache[key]
+                return None
+            _response_cache.move_to_end(key)
+            return dict(result)
+    # Fall back to the persistent cache and promote hits into memory
+    if (stored := _cache_db_get(key)) is None:
+        return None
+    ttl, result = stored
+    _cache_remember(key, result, ttl)
+    return dict(result)
 
-llm = get_llm()
 
+def _cache_remember(key: str, result: dict, ttl: float):
+    """Keep an LLM result in memory, evicting the least recently used entries beyond LLM_CACHE_SIZE."""
+    with _response_cache_lock:
+        _response_cache[key] = (time.monotonic() + ttl, dict(result))
+        _response_cache.move_to_end(key)
+        while len(_response_cache) > LLM_CACHE_SIZE:
+            _response_cache.popitem(last=False)
 
-def llm_predict(prompt: str) -> dict:
+
+def _cache_lookup(prompt, use_cache: bool) -> tuple:
+    """Return the prompt's cache key and its cached result, or None if missing or use_cache is off."""
+    key = _cache_key(prompt)
+    return key, _cache_get(key) if use_cache else None
+
+
+def _cache_put(key: str, result: dict):
+    """Store an LLM result in memory and, if configured, in the persistent cache."""
+    if LLM_CACHE_TTL <= 0:
+        return
+    _cache_remember(key, result, LLM_CACHE_TTL)
+    _cache_db_put(key, result)
+
+
+async def llm_apredict(prompt, use_cache: bool = True) -> dict:
     """Generate a structured LLM response with tokens and model metadata."""
-    if llm:
+    if get_llm() is not None:
+        # Hashing a multi-MB prompt and the sqlite calls would block the event loop
+        key, cached = await asyncio.to_thread(_cache_lookup, prompt, use_cache)
+        if cached is not None:
+            return cached
+        try:
+            print(f"🤖 Prompt: {prompt}")
+            async with _get_llm_semaphore():
+                result = _llm_result(await _ainvoke_hedged(prompt))
+        except Exception as e:
+            return _llm_error(f"LLM failed: {e!r}")
+        await asyncio.to_thread(_cache_put, key, result)
+        return result
+    return _llm_error("No LLM available.")
+
+
+def llm_predict(prompt, use_cache: bool = True) -> dict:
+    """Synchronous llm_apredict, for tools called with invoke() outside the event loop."""
+    if get_llm() is not None:
+        key, cached = _cache_lookup(prompt, use_cache)
+        if cached is not None:
+            return cached
         try:
             print(f"🤖 Prompt: {prompt}")
-            result = llm.invoke(prompt)
-            return {
-                "content": result.content if hasattr(result, "content") else str(result),
-                "response_metadata": getattr(result, "response_metadata", {}),
-                "usage_metadata": getattr(result, "usage_metadata", {})
-            }
+            with _llm_sync_semaphore:
+                result = _llm_result(_invoke_hedged_sync(prompt))
         except Exception as e:
-            return {
-                "content": f"LLM failed: {e}",
-                "response_metadata": {},
-                "usage_metadata": {}
-            }
+            return _llm_error(f"LLM failed: {e!r}")
+        _cache_put(key, result)
+        return result
+    return _llm_error("No LLM available.")
+
+
+SECRET_PATTERNS = [
+    r'AKIA[0-9A-Z]{16}',
+    r'(?i:secret[_-]?key\s*=\s*["\'][^"\']+["\'])',
+    r'(?i:password\s*=\s*["\'][^"\']+["\'])',
+    r'(?i:api[_-]?key\s*=\s*["\'][^"\']+["\'])'
+]
+# All secret patterns fused into one alternation so each file is scanned once; files
+# are scanned as raw bytes, so the patterns are too
+_SECRETS_RE = re.compile("|".join(f"(?P<p{i}>{p})" for i, p in enumerate(SECRET_PATTERNS)).encode())
+
+
+def _compile_secrets_hs():
+    """Compile the secret patterns into one Hyperscan database, or return None if unavailable."""
+    if hyperscan is None:
+        return None
+    try:
+        db = hyperscan.Database()
+        db.compile(
+            expressions=[p.encode() for p in SECRET_PATTERNS],
+            ids=list(range(len(SECRET_PATTERNS))),
+            elements=len(SECRET_PATTERNS),
+            flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(SECRET_PATTERNS),
+        )
+    except Exception as e:
+        print(f"Hyperscan unavailable, using re for secret scanning: {e}")
+        return None
+    return db
+
+
+_SECRETS_HS = _compile_secrets_hs()
+# A literal every secret pattern starts with (lowercased); the re path skips files containing none
+SECRET_PREFIXES = (b"akia", b"secret", b"password", b"api")
+# Hyperscan scratch space cannot be shared between concurrent scans, so each thread gets its own
+_hs_local = threading.local()
+# Case-sensitive keywords that mark a failed build, and the case-insensitive words that
+# mark an error line. check_build_status searches for the keywords alone and stops at the
+# first hit; the full scan matches both together so the log is read once.
+BUILD_FAILURE_KEYWORDS = ("BUILD FAILURE", "FAILURE", "Error:", "Exception", "Traceback")
+ERROR_LINE_WORDS = ("error", "exception")
+_BUILD_FAILURE_RE = re.compile("|".join(map(re.escape, BUILD_FAILURE_KEYWORDS)))
+_BUILD_LOG_RE = re.compile(f"{_BUILD_FAILURE_RE.pattern}|(?i:{'|'.join(map(re.escape, ERROR_LINE_WORDS))})")
+# Line boundaries str.splitlines() recognizes besides "\n" ("\r\n" ends at its "\r")
+_LINE_BREAK_RE = re.compile(r"[\r\x0b\x0c\x1c-\x1e\x85\u2028\u2029]")
+_SLOW_TEST_RE = re.compile(r"(\d+(?:\.\d+)?)s\s+->\s+([\w\.]+)")
+# Case-insensitive search instead of lowercasing a copy of every line
+_DEPRECATED_RE = re.compile(r"deprecated", re.IGNORECASE)
+# Every Dockerfile pattern in one alternation, so each Dockerfile is scanned once
+_DOCKERFILE_RE = re.compile(
+    rb"(?P<latest>latest)|(?P<add>^[ \t]*add\s)|(?P<apt>apt-get install)|(?P<no_recommends>--no-install-recommends)",
+    re.IGNORECASE | re.MULTILINE,
+)
+EXCLUDED_DIRS = {'.git', '__pycache__', 'venv', '.venv', 'node_modules'}
+SECRET_SCAN_SUFFIXES = frozenset({'.py', '.env', '.yml', '.yaml', '.json', '.js'})
+# Every file any filesystem check reads: the secret-scan suffixes plus the named files
+ALLOWED_SUFFIXES = SECRET_SCAN_SUFFIXES
+ALLOWED_NAMES = frozenset({'dockerfile', 'requirements.txt', 'package.json'})
+CPU_BOUND_SUFFIXES = frozenset({'.py', '.yml', '.yaml', '.json'})
+_process_pool = None
+# Filesystem tool results keyed by (root_dir, tree fingerprint, tool names), oldest first;
+# used from the event loop and from agent tool worker threads
+_fs_results = OrderedDict()
+_fs_results_lock = threading.Lock()
+FS_RESULTS_CACHE_SIZE = 32
+# Tree listings by root_dir, oldest first: root_dir -> (SCAN_CACHE_TTL epoch, RepoScan)
+_scans = OrderedDict()
+_scans_lock = threading.Lock()
+SCAN_CACHE_SIZE = 32
+# Longest a cached tree listing is reused, in seconds, for callers that do not clear it
+SCAN_CACHE_TTL = 30
+# Files handed to a worker per round trip; amortizes pickling and IPC over many small files
+FS_CHUNK_SIZE = 32
+# Log tool results keyed by a digest of the log, oldest first; agent tools may run on threads
+_log_results = OrderedDict()
+_log_results_lock = threading.Lock()
+LOG_RESULTS_CACHE_SIZE = 8
+# Log text is split into lines one block of characters at a time so no list of every
+# line is ever built
+LOG_BLOCK_SIZE = 1 << 16
+# Files at least this large are memory-mapped for the byte scans instead of copied into memory
+MMAP_THRESHOLD = 1 << 20
+# package.json files at least this large are streamed for their dependencies; below it a
+# full orjson parse is faster than ijson
+JSON_STREAM_THRESHOLD = 1 << 20
+
+
+def _suffix(fname: str) -> str:
+    """Return the file extension including the dot; dotfiles like '.env' are their own suffix."""
+    i = fname.rfind(".")
+    return fname[i:] if i != -1 else ""
+
+
+def _line_at(log: str, start: int, end: int) -> tuple[str, int]:
+    """Return the line containing log[start:end], split as str.splitlines() would, and the offset where it ends."""
+    # Bound the line by newlines first, then look for the rarer breaks only within it,
+    # so each lookup costs the length of the line rather than of the rest of the log
+    line_start = log.rfind("\n", 0, start) + 1
+    line_end = log.find("\n", end)
+    if line_end == -1:
+        line_end = len(log)
+    for match in _LINE_BREAK_RE.finditer(log, line_start, start):
+        line_start = match.end()
+    if match := _LINE_BREAK_RE.search(log, end, line_end):
+        line_end = match.start()
+    return log[line_start:line_end], line_end
+
+
+def _scan_build_log(log: str) -> tuple[bool, list[str]]:
+    """Find whether the log shows a failed build, and its error lines, in a single pass."""
+    failed = False
+    error_lines = []
+    pos = line_end = 0
+    while match := _BUILD_LOG_RE.search(log, pos):
+        word = match.group()
+        if word in BUILD_FAILURE_KEYWORDS:
+            failed = True
+        if word.lower().startswith(ERROR_LINE_WORDS):
+            if match.start() >= line_end:
+                line, line_end = _line_at(log, match.start(), match.end())
+                error_lines.append(line)
+            pos = match.end()
+        else:
+            # A keyword that is not an error word may overlap one (the last E of FAILURE
+            # can start ERROR), so resume just after its start
+            pos = match.start() + 1
+        if failed:
+            # Nothing else on an already reported line can change the result
+            pos = max(pos, line_end)
+    return failed, error_lines
+
+
+def _build_status(failed: bool) -> str:
+    """Format the check_build_status tool result."""
+    return "Build failed." if failed else "Build passed."
+
+
+def _format_build_log(failed: bool, error_lines: list[str]) -> dict:
+    """Format the check_build_status and extract_error_lines tool results."""
     return {
-        "content": "No LLM available.",
-        "response_metadata": {},
-        "usage_metadata": {}
+        "check_build_status": _build_status(failed),
+        "extract_error_lines": "\n".join(error_lines) or "No errors found.",
     }
 
 
+def run_build_log_tools(log: str) -> dict:
+    """Compute check_build_status and extract_error_lines in a single pass over the log."""
+    return _format_build_log(*_scan_build_log(log))
+
+
+def iter_log_blocks(log: str, size: int = LOG_BLOCK_SIZE):
+    """Yield consecutive slices of the log of about `size` characters, each ending at a newline."""
+    start = 0
+    while start < len(log):
+        end = log.find("\n", start + size) + 1 or len(log)
+        yield log[start:end]
+        start = end
+
+
+def iter_log_lines(log: str):
+    """Yield the lines of the log exactly as log.splitlines() would, one block's worth held at a time."""
+    for block in iter_log_blocks(log):
+        yield from block.splitlines()
+
+
 @tool
 def check_build_status(log: str) -> str:
     """Detect if Jenkins log indicates build failure."""
-    keywords = ["BUILD FAILURE", "FAILURE", "Error:", "Exception", "Traceback"]
-    return "Build failed." if any(k in log for k in keywords) else "Build passed."
+    # One search that stops at the first failure keyword; the full scan is only needed for error lines
+    return _build_status(_BUILD_FAILURE_RE.search(log) is not None)
 
 
 @tool
 def extract_error_lines(log: str) -> str:
     """Extract error or exception lines from Jenkins log."""
-    lines = log.splitlines()
-    return "\n".join([l for l in lines if "error" in l.lower() or "exception" in l.lower()]) or "No errors found."
+    return analyze_log(log)["extract_error_lines"]
 
 
-@tool
-def suggest_fixes(errors: str) -> str:
+def llm_tool(coroutine, instruction: str) -> StructuredTool:
+    """Expose an async LLM helper as a tool, named without its "a" prefix, usable from invoke() and ainvoke().
+
+    invoke() sends the same prompt through llm_predict on the sync HTTP clients rather
+    than running the coroutine on a second event loop, whose connections, pools and
+    semaphores could not be shared with the server's.
+    """
+    signature = inspect.signature(coroutine)
+    content_arg = next(iter(signature.parameters))
+
+    @wraps(coroutine)
+    def run(*args, **kwargs):
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return llm_predict(build_prompt(instruction, bound.arguments[content_arg]), bound.arguments["use_cache"])
+    # Keep use_cache out of the argument schema the agent sees
+    run.__signature__ = signature.replace(parameters=[p for p in signature.parameters.values() if p.name != "use_cache"])
+    return StructuredTool.from_function(func=run, coroutine=coroutine, name=coroutine.__name__[1:])
+
+
+async def asuggest_fixes(errors: str, use_cache: bool = True) -> str:
     """Suggest fixes based on extracted Jenkins error lines using LLM."""
-    return llm_predict(f"Suggest fixes for the following Jenkins build errors:\n{errors}")
+    return await llm_apredict(build_prompt(SUGGEST_FIXES_PROMPT, errors), use_cache)
 
 
-@tool
-def explain_yml(content: str) -> str:
+suggest_fixes = llm_tool(asuggest_fixes, SUGGEST_FIXES_PROMPT)
+
+
+async def aexplain_yml(content: str, use_cache: bool = True) -> str:
     """Explain a Jenkins pipeline YAML configuration using LLM."""
-    return llm_predict(f"Explain this Jenkins pipeline YAML file:\n{content}")
+    return await llm_apredict(build_prompt(EXPLAIN_YML_PROMPT, content), use_cache)
 
 
-@tool
-def check_tf_issues(tf_file: str) -> str:
+explain_yml = llm_tool(aexplain_yml, EXPLAIN_YML_PROMPT)
+
+
+async def acheck_tf_issues(tf_file: str, use_cache: bool = True) -> str:
     """Detect common Terraform misconfigurations using LLM."""
-    return llm_predict(f"Check for misconfigurations in this Terraform file:\n{tf_file}")
+    return await llm_apredict(build_prompt(CHECK_TF_ISSUES_PROMPT, tf_file), use_cache)
 
 
-@tool
-def generate_pr_text(fix_summary: str) -> str:
+check_tf_issues = llm_tool(acheck_tf_issues, CHECK_TF_ISSUES_PROMPT)
+
+
+async def agenerate_pr_text(fix_summary: str, use_cache: bool = True) -> str:
     """Generate a GitHub PR title and body based on the provided fix summary."""
-    return llm_predict(f"Create a GitHub PR title and body for the following fix:\n{fix_summary}")
+    return await llm_apredict(build_prompt(GENERATE_PR_TEXT_PROMPT, fix_summary), use_cache)
 
 
-@tool
-def summarize_log(log: str) -> str:
+generate_pr_text = llm_tool(agenerate_pr_text, GENERATE_PR_TEXT_PROMPT)
+
+
+async def asummarize_log(log: str, use_cache: bool = True) -> str:
     """Generate a human-readable summary of the provided Jenkins build log."""
-    return llm_predict(f"Summarize this Jenkins log:\n{log}")
+    return await llm_apredict(build_prompt(SUMMARIZE_LOG_PROMPT, log), use_cache)
+
+
+summarize_log = llm_tool(asummarize_log, SUMMARIZE_LOG_PROMPT)
+
+
+async def analyze_log_bundle(log: str, errors: str, use_cache: bool = True) -> dict:
+    """Run every LLM tool on a log concurrently; the PR text follows as soon as its fixes are in."""
+    async def fixes_then_pr_text():
+        fixes = await asuggest_fixes(errors, use_cache)
+        return fixes, await agenerate_pr_text(fixes["content"], use_cache)
+
+    summary, yml, tf, (fixes, pr_text) = await asyncio.gather(
+        asummarize_log(log, use_cache),
+        aexplain_yml(log, use_cache),
+        acheck_tf_issues(log, use_cache),
+        fixes_then_pr_text(),
+    )
+    return {
+        "summarize_log": summary,
+        "explain_yml": yml,
+        "check_tf_issues": tf,
+        "suggest_fixes": fixes,
+        "generate_pr_text": pr_text,
+    }
+
+def run_line_log_tools(lines: list[str]) -> dict:
+    """Compute detect_slow_tests, extract_failed_tests and detect_deprecated_warnings in one loop over log lines."""
+    slow_tests = []
+    failed_tests = []
+    warnings = []
+    capture = failed_section_done = False
+    for line in lines:
+        match = _SLOW_TEST_RE.search(line)
+        if match and float(match.group(1)) > 5.0:
+            slow_tests.append(f"Slow test: {match.group(2)} took {match.group(1)}s")
+        if not failed_section_done:
+            if "Failed tests:" in line:
+                capture = True
+            elif capture and line.strip() == "":
+                failed_section_done = True
+            elif capture:
+                failed_tests.append(line.strip())
+        if _DEPRECATED_RE.search(line):
+            warnings.append(line)
+    return {
+        "detect_slow_tests": "\n".join(slow_tests) or "No slow tests found.",
+        "extract_failed_tests": "\n".join(failed_tests) or "No failed tests found.",
+        "detect_deprecated_warnings": "\n".join(warnings) or "No deprecated warnings found.",
+    }
+
+
+def analyze_log(log: str) -> dict:
+    """Compute every regex- and line-based log tool result in one go.
+
+    Memoized on a digest of the log text, so an agent calling several log tools on the
+    same log scans it only once, without the cache keeping multi-MB logs alive.
+    """
+    key = hashlib.blake2b(log.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _log_results_lock:
+        if (cached := _log_results.get(key)) is not None:
+            _log_results.move_to_end(key)
+            return cached
+    results = {**run_build_log_tools(log), **run_line_log_tools(iter_log_lines(log))}
+    with _log_results_lock:
+        _log_results[key] = results
+        while len(_log_results) > LOG_RESULTS_CACHE_SIZE:
+            _log_results.popitem(last=False)
+    return results
+
 
 @tool
 def detect_slow_tests(log: str) -> str:
     """Identify test cases that exceed 5 seconds from Jenkins log output."""
-    slow_tests = []
-    for line in log.splitlines():
-        match = re.search(r"(\d+(\.\d+)?)s\s+->\s+([\w\.]+)", line)
-        if match and float(match.group(1)) > 5.0:
-            slow_tests.append(f"Slow test: {match.group(3)} took {match.group(1)}s")
-    return "\n".join(slow_tests) or "No slow tests found."
+    return analyze_log(log)["detect_slow_tests"]
 
 
 @tool
 def extract_failed_tests(log: str) -> str:
     """Extract failed test case names from Jenkins logs under 'Failed tests' section."""
-    failed_tests = []
-    capture = False
-    for line in log.splitlines():
-        if "Failed tests:" in line:
-            capture = True
-        elif capture and line.strip() == "":
-            break
-        elif capture:
-            failed_tests.append(line.strip())
-    return "\n".join(failed_tests) or "No failed tests found."
+    return analyze_log(log)["extract_failed_tests"]
 
 
 @tool
 def detect_deprecated_warnings(log: str) -> str:
     """Identify lines in Jenkins logs that contain 'deprecated' warnings."""
-    warnings = [line for line in log.splitlines() if "deprecated" in line.lower()]
-    return "\n".join(warnings) or "No deprecated warnings found."
+    return analyze_log(log)["detect_deprecated_warnings"]
+
+
+# One file found by _scan_tree; size and mtime feed the tree fingerprint
+FileEntry = namedtuple("FileEntry", "path name size mtime")
+RepoScan = namedtuple("RepoScan", "entries fingerprint")
+
+
+def _scan_tree(root_dir: str) -> RepoScan:
+    """List every file under root_dir, pruning EXCLUDED_DIRS, and fingerprint the tree.
+
+    Cached until clear_scan_cache() or for at most SCAN_CACHE_TTL seconds, so every
+    filesystem tool in a session shares one walk while callers that never clear the
+    cache still notice edits.
+    """
+    epoch = int(time.monotonic() // SCAN_CACHE_TTL)
+    with _scans_lock:
+        cached = _scans.get(root_dir)
+        if cached is not None and cached[0] == epoch:
+            _scans.move_to_end(root_dir)
+            return cached[1]
+    scan = _walk_tree(root_dir)
+    with _scans_lock:
+        # One listing per root: a newer epoch replaces the old one instead of piling up beside it
+        _scans[root_dir] = (epoch, scan)
+        _scans.move_to_end(root_dir)
+        while len(_scans) > SCAN_CACHE_SIZE:
+            _scans.popitem(last=False)
+    return scan
+
+
+def _walk_tree(root_dir: str) -> RepoScan:
+    """Walk root_dir with os.scandir in the order of a top-down os.walk."""
+    entries = []
+    digest = hashlib.blake2b(digest_size=16)
+    stack = [root_dir]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                listing = list(it)
+        except OSError:
+            continue
+        subdirs = []
+        for entry in listing:
+            if entry.is_dir():
+                # Like os.walk, list symlinked directories but do not descend into them
+                if entry.name not in EXCLUDED_DIRS and not entry.is_symlink():
+                    subdirs.append(entry.path)
+                continue
+            try:
+                st = entry.stat()
+                size, mtime = st.st_size, st.st_mtime_ns
+            except OSError:
+                # A dangling symlink: still listed, as os.walk would
+                size = mtime = -1
+            entries.append(FileEntry(entry.path, entry.name, size, mtime))
+            digest.update(f"{entry.path}\0{size}\0{mtime}\n".encode("utf-8", "surrogateescape"))
+        stack.extend(reversed(subdirs))
+    return RepoScan(tuple(entries), digest.hexdigest())
+
+
+def clear_scan_cache():
+    """Forget cached tree listings; call at the start of each analysis session."""
+    with _scans_lock:
+        _scans.clear()
+
+
+def walk_repo(root_dir: str, names=None):
+    """Yield (path, fname) for every file under root_dir, from the session's cached scan.
+
+    With names, only files at least one of those filesystem checks reads are yielded.
+    """
+    for entry in _scan_tree(root_dir).entries:
+        if names is None or _wanted(entry.name, names):
+            yield entry.path, entry.name
+
+
+def _fs_result_key(root_dir: str, names) -> tuple:
+    """Key filesystem tool results by the tree's fingerprint, so they are reused while it is unchanged."""
+    return root_dir, _scan_tree(root_dir).fingerprint, tuple(names)
+
+
+def _fs_result_get(key: tuple):
+    """Return memoized filesystem tool results, or None."""
+    with _fs_results_lock:
+        result = _fs_results.get(key)
+        if result is None:
+            return None
+        _fs_results.move_to_end(key)
+        return dict(result)
+
+
+def _fs_result_put(key: tuple, result: dict):
+    """Memoize filesystem tool results, evicting the oldest beyond FS_RESULTS_CACHE_SIZE."""
+    with _fs_results_lock:
+        _fs_results[key] = dict(result)
+        while len(_fs_results) > FS_RESULTS_CACHE_SIZE:
+            _fs_results.popitem(last=False)
+
+
+def _read_bytes(path: str) -> bytes:
+    """Read a whole file in one unbuffered call."""
+    with open(path, "rb", buffering=0) as f:
+        return f.readall()
+
+
+def _has_fresh_pyc(path: str) -> bool:
+    """Return whether __pycache__ holds this interpreter's bytecode for the current source.
+
+    A timestamp-based .pyc records the source mtime and size it was compiled from;
+    if both still match, the source compiled without a syntax error.
+    """
+    try:
+        with open(importlib.util.cache_from_source(path), "rb") as f:
+            header = f.read(16)
+        st = os.stat(path)
+    except (OSError, ValueError, NotImplementedError):
+        return False
+    return (
+        len(header) == 16
+        and header[:4] == importlib.util.MAGIC_NUMBER
+        and int.from_bytes(header[4:8], "little") == 0
+        and int.from_bytes(header[8:12], "little") == int(st.st_mtime) & 0xFFFFFFFF
+        and int.from_bytes(header[12:16], "little") == st.st_size & 0xFFFFFFFF
+    )
+
+
+@contextmanager
+def _file_content(path: str):
+    """Yield a file's contents as bytes, or as a read-only mmap for large files."""
+    with open(path, "rb", buffering=0) as f:
+        if os.fstat(f.fileno()).st_size < MMAP_THRESHOLD:
+            yield f.readall()
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _finding(path: str, kind: str, message: str, line: int | None = None) -> dict:
+    """Build one filesystem finding; tools return lists of these and format them only at the boundary."""
+    return {"path": path, "kind": kind, "message": message, "line": line}
+
+
+def format_findings(findings, empty: str = "") -> str:
+    """Render findings as the one-per-line text the @tool wrappers return, or empty if there are none."""
+    return "\n".join(
+        f"{f['path']}:{f['line']}: {f['message']}" if f["line"] is not None else f"{f['path']}: {f['message']}"
+        for f in findings
+    ) or empty
+
+
+def _lint_python_file(path: str, fname: str) -> list[dict]:
+    """Report a syntax error in a single Python file."""
+    if not fname.endswith(".py") or _has_fresh_pyc(path):
+        return []
+    try:
+        # Compile the raw bytes: the parser handles the BOM and coding cookie itself
+        compile(_read_bytes(path), path, "exec", flags=ast.PyCF_ONLY_AST, dont_inherit=True)
+    except SyntaxError as e:
+        # e.msg without the "(file, line N)" suffix: the location is in the finding itself
+        return [_finding(path, "syntax_error", e.msg, e.lineno)]
+    return []
+
+
+def _check_dockerfile(path: str, fname: str) -> list[dict]:
+    """Report insecure patterns in a single Dockerfile."""
+    if fname.lower() != "dockerfile":
+        return []
+    issues = []
+    # Dockerfile keywords are ASCII, so match the raw bytes without decoding or lowercasing;
+    # each pattern's first match is reported
+    seen = {}
+    with _file_content(path) as content:
+        for match in _DOCKERFILE_RE.finditer(content):
+            seen.setdefault(match.lastgroup, match.start())
+            if {"latest", "add", "no_recommends"} <= seen.keys():
+                # Nothing further can change the result
+                break
+        lines = _line_numbers(content, seen.values())
+    if "latest" in seen:
+        issues.append(_finding(path, "dockerfile", "Avoid using 'latest' tag.", lines[seen["latest"]]))
+    if "add" in seen:
+        issues.append(_finding(path, "dockerfile", "Use COPY instead of ADD.", lines[seen["add"]]))
+    if "apt" in seen and "no_recommends" not in seen:
+        issues.append(_finding(path, "dockerfile", "Use '--no-install-recommends'.", lines[seen["apt"]]))
+    return issues
+
+
+def _line_numbers(content, offsets) -> dict:
+    """Map byte offsets in bytes or an mmap to 1-based line numbers, counting each stretch of newlines once."""
+    lines, line, last = {}, 1, 0
+    for offset in sorted(set(offsets)):
+        # Slicing copies only the gap since the previous offset (mmaps have no count())
+        line += content[last:offset].count(b"\n")
+        lines[offset] = line
+        last = offset
+    return lines
+
+
+def _has_secret_prefix(content) -> bool:
+    """Return whether content holds any SECRET_PREFIXES literal, lowercasing at most 1 MiB at a time."""
+    overlap = max(map(len, SECRET_PREFIXES)) - 1
+    for i in range(0, len(content), MMAP_THRESHOLD):
+        # A full slice of a small bytes object is the object itself, so only mmaps are copied
+        window = content[i:i + MMAP_THRESHOLD + overlap].lower()
+        if any(prefix in window for prefix in SECRET_PREFIXES):
+            return True
+    return False
+
+
+def _find_secrets(content) -> list[tuple[int, bytes]]:
+    """Return the non-overlapping secret matches in bytes or an mmap as (offset, match), leftmost first, like re.finditer."""
+    if _SECRETS_HS is None:
+        # Most files hold none of the literals; a few substring searches are far cheaper
+        # than running the alternation at every offset. Hyperscan prefilters on its own.
+        if not _has_secret_prefix(content):
+            return []
+        return [(match.start(), match.group()) for match in _SECRETS_RE.finditer(content)]
+    scratch = getattr(_hs_local, "scratch", None)
+    if scratch is None:
+        scratch = _hs_local.scratch = hyperscan.Scratch(_SECRETS_HS)
+    hits = []
+    _SECRETS_HS.scan(content, match_event_handler=lambda id_, start, end, flags, context: hits.append((start, end)), scratch=scratch)
+    # Hyperscan reports every match; keep the leftmost non-overlapping ones as re would
+    found, last_end = [], 0
+    for start, end in sorted(hits):
+        if start >= last_end:
+            found.append((start, content[start:end]))
+            last_end = end
+    return found
+
+
+def _scan_file_for_secrets(path: str, fname: str) -> list[dict]:
+    """Report hardcoded secrets in a single code or config file."""
+    if _suffix(fname) not in SECRET_SCAN_SUFFIXES:
+        return []
+    with _file_content(path) as content:
+        matches = _find_secrets(content)
+        lines = _line_numbers(content, (start for start, _ in matches))
+    return [_finding(path, "secret", match.decode("utf-8", "ignore"), lines[start]) for start, match in matches]
+
+
+def _package_dependencies(path: str) -> dict:
+    """Read the "dependencies" table of a package.json, streaming large files with ijson if installed."""
+    if ijson is not None and os.path.getsize(path) >= JSON_STREAM_THRESHOLD:
+        with open(path, "rb") as f:
+            return dict(ijson.kvitems(f, "dependencies"))
+    return _json_loads(_read_bytes(path)).get("dependencies", {})
+
+
+def _check_dependency_file(path: str, fname: str) -> list[dict]:
+    """Report unpinned or insecure versions in a requirements.txt or package.json."""
+    findings = []
+    if fname == "requirements.txt":
+        with open(path) as f:
+            for lineno, line in enumerate(f, 1):
+                if "==" in line and "0.0.0" in line:
+                    findings.append(_finding(path, "dependency", f"{line.strip()} looks insecure", lineno))
+    elif fname == "package.json":
+        for k, v in _package_dependencies(path).items():
+            if v in ["*", "latest"]:
+                findings.append(_finding(path, "dependency", f"{k} version is not pinned: {v}"))
+    return findings
+
+
+def _json_loads(data):
+    """Parse JSON with orjson when available, falling back to the stdlib parser."""
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects some valid JSON (e.g. integers beyond 64 bits); let the
+            # stdlib parser decide so only real syntax errors are reported
+            pass
+    return json.loads(data)
+
+
+def _json_dumps(obj) -> bytes:
+    """Serialize to compact UTF-8 JSON bytes with orjson when available, falling back to the stdlib."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str)
+        except TypeError:
+            # e.g. non-string dict keys, which the stdlib coerces and orjson refuses
+            pass
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _check_yaml_json_file(path: str, fname: str) -> list[dict]:
+    """Report a syntax error in a single YAML or JSON file."""
+    try:
+        if fname.endswith((".yml", ".yaml")):
+            # Binary mode: libyaml detects the encoding itself, so there is no decode step
+            with open(path, "rb") as f:
+                # Only syntax matters: drain the parser's event stream instead of building objects
+                for _ in yaml.parse(f, Loader=YamlSafeLoader):
+                    pass
+        elif fname.endswith(".json"):
+            _json_loads(_read_bytes(path))
+    except Exception as e:
+        # JSONDecodeError carries a 1-based lineno, YAML errors a 0-based problem_mark
+        mark = getattr(e, "problem_mark", None)
+        line = getattr(e, "lineno", None) or (mark.line + 1 if mark is not None else None)
+        return [_finding(path, "syntax_error", str(e), line)]
+    return []
+
+
+# Filesystem tools: name -> (per-file check, result when nothing is found)
+FS_CHECKS = {
+    "lint_python_files": (_lint_python_file, "No Python syntax errors found."),
+    "check_dockerfile_security": (_check_dockerfile, "No Dockerfile issues found."),
+    "scan_for_secrets": (_scan_file_for_secrets, "No secrets found."),
+    "check_dependency_vulnerabilities": (_check_dependency_file, "No obvious dependency issues."),
+    "check_yaml_json_syntax": (_check_yaml_json_file, "No YAML/JSON syntax errors."),
+}
+
+
+# Filesystem tools: name -> whether its check reads a file with this name
+FS_CHECK_TARGETS = {
+    "lint_python_files": lambda fname: fname.endswith(".py"),
+    "check_dockerfile_security": lambda fname: fname.lower() == "dockerfile",
+    "scan_for_secrets": lambda fname: _suffix(fname) in SECRET_SCAN_SUFFIXES,
+    "check_dependency_vulnerabilities": lambda fname: fname in ("requirements.txt", "package.json"),
+    "check_yaml_json_syntax": lambda fname: fname.endswith((".yml", ".yaml", ".json")),
+}
+
+
+def _wanted(fname: str, names) -> bool:
+    """Return whether any of the named checks reads fname; most files are rejected by the first test."""
+    if _suffix(fname) not in ALLOWED_SUFFIXES and fname.lower() not in ALLOWED_NAMES:
+        return False
+    return any(FS_CHECK_TARGETS[name](fname) for name in names)
+
+
+# Tool outputs that mean "nothing to report"
+EMPTY_RESULTS = frozenset({
+    "No errors found.", "No slow tests found.", "No failed tests found.",
+    "No deprecated warnings found.", *(empty for _, empty in FS_CHECKS.values()),
+})
+
+
+def _lint_with_ruff(root_dir: str):
+    """Find Python syntax errors with ruff's Rust parser as findings; None if ruff is missing or fails."""
+    ruff = shutil.which("ruff")
+    if ruff is None:
+        return None
+    try:
+        # Check the files the ast fallback would: ignore ruff's config files, default
+        # excludes and .gitignore, and exclude EXCLUDED_DIRS instead
+        result = subprocess.run(
+            [ruff, "check", "--isolated", "--select=E9", "--output-format=json", "--exit-zero", "--no-cache",
+             "--no-respect-gitignore", f"--exclude={','.join(sorted(EXCLUDED_DIRS))}", root_dir],
+            # Keep stdout as bytes: orjson parses them without a decode step
+            capture_output=True,
+        )
+        if result.returncode != 0:
+            return None
+        # Like the ast fallback, keep only each file's first error, in walk order; ruff
+        # reports absolute paths, so map them back to the root_dir-based ones the walk yields
+        walked = {os.path.realpath(path): (i, path) for i, (path, _) in enumerate(walk_repo(root_dir, ["lint_python_files"]))}
+        first = {}
+        for d in _json_loads(result.stdout):
+            entry = walked.get(os.path.realpath(d["filename"]))
+            if entry is not None and entry not in first:
+                first[entry] = d
+        return [
+            _finding(path, "syntax_error", d["message"], d["location"]["row"])
+            for (_, path), d in sorted(first.items())
+        ]
+    except Exception as e:
+        print(f"ruff failed, falling back to ast: {e}")
+        return None
+
+
+def _prepare_fs_checks(root_dir: str, names) -> tuple[list, dict]:
+    """Hand lint_python_files to ruff when available; return the checks left for the walk and the findings so far."""
+    names = list(names)
+    if "lint_python_files" in names:
+        lint = _lint_with_ruff(root_dir)
+        if lint is not None:
+            names.remove("lint_python_files")
+            return names, {"lint_python_files": lint}
+    return names, {}
+
+
+def check_file(path: str, fname: str, names) -> dict:
+    """Run the named filesystem checks on a single file."""
+    findings = {}
+    for name in names:
+        try:
+            findings[name] = FS_CHECKS[name][0](path, fname)
+        except Exception as e:
+            findings[name] = [_finding(path, "read_error", f"Error reading file - {e}")]
+    return findings
+
+
+def check_files(files, names) -> list[dict]:
+    """Run the named filesystem checks on a chunk of (path, fname) pairs."""
+    return [check_file(path, fname, names) for path, fname in files]
+
+
+def _merge_fs_findings(names, per_file) -> dict:
+    """Merge per-file findings into one list per filesystem tool."""
+    findings = {name: [] for name in names}
+    for file_findings in per_file:
+        for name, items in file_findings.items():
+            findings[name].extend(items)
+    return findings
+
+
+def format_fs_results(findings: dict) -> dict:
+    """Render each filesystem tool's findings as its text result."""
+    return {name: format_findings(items, FS_CHECKS[name][1]) for name, items in findings.items()}
+
+
+def run_fs_findings(root_dir: str, names) -> dict:
+    """Run the named filesystem checks over root_dir in a single directory walk; return findings per tool."""
+    key = _fs_result_key(root_dir, names)
+    if (cached := _fs_result_get(key)) is not None:
+        return cached
+    findings = _run_fs_checks(root_dir, names)
+    _fs_result_put(key, findings)
+    return findings
+
+
+def run_fs_checks(root_dir: str, names) -> dict:
+    """Run the named filesystem checks over root_dir in a single directory walk."""
+    return format_fs_results(run_fs_findings(root_dir, names))
+
+
+def _run_fs_checks(root_dir: str, names) -> dict:
+    """Run the named filesystem checks, fanning large trees out to the process pool."""
+    names, findings = _prepare_fs_checks(root_dir, names)
+    if not names:
+        return findings
+    files = list(walk_repo(root_dir, names))
+    if len(files) <= FS_CHUNK_SIZE:
+        # Not worth a round trip to the process pool
+        per_file = check_files(files, names)
+    else:
+        paths, fnames = zip(*files)
+        per_file = _get_process_pool().map(check_file, paths, fnames, repeat(names), chunksize=FS_CHUNK_SIZE)
+    findings.update(_merge_fs_findings(names, per_file))
+    return findings
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    """Lazily create the process pool used for CPU-bound parsing."""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _process_pool
+
+
+async def run_all_fs_findings_async(root_dir: str) -> dict:
+    """Run every filesystem tool over root_dir, checking files concurrently; return findings per tool.
+
+    Parsing-heavy files (Python, YAML, JSON) go to a process pool to get past the
+    GIL; everything else runs on threads. Files are sent in chunks of FS_CHUNK_SIZE
+    and a semaphore bounds in-flight chunks.
+    """
+    key = await asyncio.to_thread(_fs_result_key, root_dir, FS_CHECKS)
+    if (cached := _fs_result_get(key)) is not None:
+        return cached
+    names, findings = await asyncio.to_thread(_prepare_fs_checks, root_dir, FS_CHECKS)
+    if names:
+        findings.update(await _run_fs_checks_async(root_dir, names))
+    _fs_result_put(key, findings)
+    return findings
+
+
+async def _run_fs_checks_async(root_dir: str, names) -> dict:
+    """Run the named per-file checks concurrently over the pruned walk."""
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore((os.cpu_count() or 1) * 2)
+    files = await asyncio.to_thread(lambda: list(walk_repo(root_dir, names)))
+    per_file = [None] * len(files)
+
+    async def process_chunk(indices, cpu_bound):
+        chunk = [files[i] for i in indices]
+        async with semaphore:
+            if cpu_bound:
+                found = await loop.run_in_executor(_get_process_pool(), check_files, chunk, names)
+            else:
+                found = await asyncio.to_thread(check_files, chunk, names)
+        # Put findings back in walk order whatever order the chunks finish in
+        for i, file_findings in zip(indices, found):
+            per_file[i] = file_findings
+
+    cpu_files = [i for i, (_, fname) in enumerate(files) if _suffix(fname) in CPU_BOUND_SUFFIXES]
+    other_files = [i for i, (_, fname) in enumerate(files) if _suffix(fname) not in CPU_BOUND_SUFFIXES]
+    await asyncio.gather(
+        *(process_chunk(cpu_files[i:i + FS_CHUNK_SIZE], True) for i in range(0, len(cpu_files), FS_CHUNK_SIZE)),
+        *(process_chunk(other_files[i:i + FS_CHUNK_SIZE], False) for i in range(0, len(other_files), FS_CHUNK_SIZE)),
+    )
+    return _merge_fs_findings(names, per_file)
 
 
 @tool
 def lint_python_files(root_dir: str) -> str:
     """Recursively lint Python files for syntax errors in a given directory."""
-    errors = []
-    for dirpath, _, filenames in os.walk(root_dir):
-        for fname in filenames:
-            if fname.endswith(".py"):
-                try:
-                    with open(os.path.join(dirpath, fname), encoding="utf-8") as f:
-                        ast.parse(f.read())
-                except SyntaxError as e:
-                    errors.append(f"{fname}: {e}")
-    return "\n".join(errors) or "No Python syntax errors found."
+    return run_fs_checks(root_dir, ["lint_python_files"])["lint_python_files"]
 
 
 @tool
 def check_dockerfile_security(root_dir: str) -> str:
     """Check Dockerfiles for insecure patterns like 'latest' tags or unsafe commands."""
-    issues = []
-    for dirpath, _, filenames in os.walk(root_dir):
-        for fname in filenames:
-            if fname.lower() == "dockerfile":
-                with open(os.path.join(dirpath, fname), encoding="utf-8") as f:
-                    content = f.read().lower()
-                if "latest" in content:
-                    issues.append(f"{fname}: Avoid using 'latest' tag.")
-                if "add " in content:
-                    issues.append(f"{fname}: Use COPY instead of ADD.")
-                if "apt-get install" in content and "--no-install-recommends" not in content:
-                    issues.append(f"{fname}: Use '--no-install-recommends'.")
-    return "\n".join(issues) or "No Dockerfile issues found."
+    return run_fs_checks(root_dir, ["check_dockerfile_security"])["check_dockerfile_security"]
 
 
 @tool
 def scan_for_secrets(root_dir: str) -> str:
     """Scan for hardcoded secrets or API keys in common code and config files, skipping virtual environments."""
-    patterns = [
-        r'AKIA[0-9A-Z]{16}',
-        r'(?i)secret[_-]?key\s*=\s*["\'][^"\']+["\']',
-        r'(?i)password\s*=\s*["\'][^"\']+["\']',
-        r'(?i)api[_-]?key\s*=\s*["\'][^"\']+["\']'
-    ]
-    EXCLUDED_DIRS = {'.git', '__pycache__', 'venv', '.venv', 'node_modules'}
-    findings = []
-
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
-        for fname in filenames:
-            if fname.endswith(('.py', '.env', '.yml', '.yaml', '.json', '.js')):
-                path = os.path.join(dirpath, fname)
-                try:
-                    with open(path, encoding="utf-8", errors="ignore") as f:
-                        content = f.read()
-                        for pattern in patterns:
-                            for match in re.findall(pattern, content):
-                                findings.append(f"{path}: {match}")
-                except Exception as e:
-                    findings.append(f"{path}: Error reading file - {e}")
-    return "\n".join(findings) or "No secrets found."
+    return run_fs_checks(root_dir, ["scan_for_secrets"])["scan_for_secrets"]
 
 
 @tool
 def check_dependency_vulnerabilities(root_dir: str) -> str:
     """Check requirements.txt or package.json for unpinned or insecure versions."""
-    findings = []
-    for dirpath, _, filenames in os.walk(root_dir):
-        if "requirements.txt" in filenames:
-            with open(os.path.join(dirpath, "requirements.txt")) as f:
-                for line in f:
-                    if "==" in line and "0.0.0" in line:
-                        findings.append(f"{line.strip()} looks insecure")
-        if "package.json" in filenames:
-            with open(os.path.join(dirpath, "package.json")) as f:
-                data = json.load(f)
-                for k, v in data.get("dependencies", {}).items():
-                    if v in ["*", "latest"]:
-                        findings.append(f"{k} version is not pinned: {v}")
-    return "\n".join(findings) or "No obvious dependency issues."
+    return run_fs_checks(root_dir, ["check_dependency_vulnerabilities"])["check_dependency_vulnerabilities"]
 
 
 @tool
 def check_yaml_json_syntax(root_dir: str) -> str:
     """Validate syntax for all YAML and JSON files in the specified directory."""
-    errors = []
-    for dirpath, _, filenames in os.walk(root_dir):
-        for fname in filenames:
-            path = os.path.join(dirpath, fname)
-            try:
-                with open(path, encoding="utf-8") as f:
-                    if fname.endswith((".yml", ".yaml")):
-                        yaml.safe_load(f)
-                    elif fname.endswith(".json"):
-                        json.load(f)
-            except Exception as e:
-                errors.append(f"{path}: {e}")
-    return "\n".join(errors) or "No YAML/JSON syntax errors."
+    return run_fs_checks(root_dir, ["check_yaml_json_syntax"])["check_yaml_json_syntax"]
+
+
+def _parse_pylint_json(output: str) -> dict:
+    """Group pylint's JSON messages by file."""
+    issues = {}
+    for m in _json_loads(output):
+        issues.setdefault(m["path"], []).append(f"{m['line']}:{m['column']}: {m['message-id']} {m['message']} ({m['symbol']})")
+    return issues
+
+
+def _parse_eslint_json(output: str) -> dict:
+    """Group eslint's JSON messages by file."""
+    return {
+        f["filePath"]: [f"{m.get('line', 0)}:{m.get('column', 0)}: {m['message']} ({m.get('ruleId')})" for m in f["messages"]]
+        for f in _json_loads(output) if f["messages"]
+    }
+
+
+# Static analyzers: language -> (suffixes, command, JSON output parser or None for plain
+# text, files per invocation, whether one invocation may only cover a single directory)
+STATIC_ANALYZERS = {
+    "Python": ((".py",), ["pylint", "--jobs=0", "--output-format=json"], _parse_pylint_json, 200, False),
+    "JavaScript": ((".js",), ["eslint", "--format=json"], _parse_eslint_json, 200, False),
+    "Go": ((".go",), ["golint"], None, 200, True),
+    "Java": ((".java",), ["checkstyle", "-c", "/google_checks.xml"], None, 200, False),
+    "PHP": ((".php",), ["php", "-l"], None, 1, False),
+    "C/C++": ((".c", ".cpp"), ["clang-tidy"], None, 200, False),
+}
+
+
+def _static_analysis_batches(files):
+    """Group files into (language, paths) batches of at most each linter's batch size."""
+    groups = {}
+    for path, fname in files:
+        for language, (suffixes, _, _, _, per_directory) in STATIC_ANALYZERS.items():
+            if fname.endswith(suffixes):
+                key = (language, os.path.dirname(path) if per_directory else None)
+                groups.setdefault(key, []).append(path)
+                break
+    for (language, _), paths in groups.items():
+        size = STATIC_ANALYZERS[language][3]
+        for i in range(0, len(paths), size):
+            yield language, paths[i:i + size]
+
+
+def _analyze_batch(language: str, paths: list) -> list[str]:
+    """Run one linter over a batch of files and format its findings."""
+    _, command, parse, _, _ = STATIC_ANALYZERS[language]
+    try:
+        result = subprocess.run([*command, *paths], capture_output=True, text=True)
+    except FileNotFoundError:
+        return [f"Required linter tool not found: {command[0]} ({len(paths)} {language} files skipped)"]
+    except Exception as e:
+        return [f"{language}: Error running analysis - {e}"]
+    if parse is not None:
+        try:
+            return [f"{path} ({language}):\n" + "\n".join(issues) for path, issues in parse(result.stdout).items()]
+        except Exception:
+            # Not the expected JSON (e.g. the linter crashed); report what it printed
+            pass
+    output = (result.stdout or result.stderr).strip()
+    if not output:
+        return []
+    target = paths[0] if len(paths) == 1 else f"{len(paths)} files"
+    return [f"{target} ({language}):\n{output}"]
 
 
 @tool
 def run_static_analysis(root_dir: str) -> str:
     """Run static analysis for multiple languages (Python, JavaScript, Go, Java, PHP, C/C++)."""
-    EXCLUDED_DIRS = {'.git', '__pycache__', 'venv', '.venv', 'node_modules'}
-    reports = []
-
-    for dirpath, dirnames, filenames in os.walk(root_dir):
-        dirnames[:] = [d for d in dirnames if d not in EXCLUDED_DIRS]
-        for fname in filenames:
-            path = os.path.join(dirpath, fname)
+    # One linter process per batch of up to 200 files amortizes interpreter startup; the
+    # linters run as subprocesses, so threads are enough to run the batches in parallel
+    key = _fs_result_key(root_dir, ["run_static_analysis"])
+    if (cached := _fs_result_get(key)) is not None:
+        return cached["run_static_analysis"]
+    batches = list(_static_analysis_batches(walk_repo(root_dir)))
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as pool:
+        reports = [report for found in pool.map(lambda b: _analyze_batch(*b), batches) for report in found]
 
-            try:
-                if fname.endswith(".py"):
-                    result = subprocess.run(["pylint", path], capture_output=True, text=True)
-                    reports.append(f"{path} (Python):\n{result.stdout}")
-                elif fname.endswith(".js"):
-                    result = subprocess.run(["eslint", path], capture_output=True, text=True)
-                    reports.append(f"{path} (JavaScript):\n{result.stdout}")
-                elif fname.endswith(".go"):
-                    result = subprocess.run(["golint", path], capture_output=True, text=True)
-                    reports.append(f"{path} (Go):\n{result.stdout}")
-                elif fname.endswith(".java"):
-                    result = subprocess.run(["checkstyle", "-c", "/google_checks.xml", path], capture_output=True, text=True)
-                    reports.append(f"{path} (Java):\n{result.stdout}")
-                elif fname.endswith(".php"):
-                    result = subprocess.run(["php", "-l", path], capture_output=True, text=True)
-                    reports.append(f"{path} (PHP):\n{result.stdout}")
-                elif fname.endswith(('.c', '.cpp')):
-                    result = subprocess.run(["clang-tidy", path], capture_output=True, text=True)
-                    reports.append(f"{path} (C/C++):\n{result.stdout}")
-            except FileNotFoundError:
-                reports.append(f"{path}: Required linter tool not found for extension {fname}")
-            except Exception as e:
-                reports.append(f"{path}: Error running analysis - {e}")
-
-    return "\n\n".join(reports) or "No static analysis issues found."
+    result = "\n\n".join(reports) or "No static analysis issues found."
+    _fs_result_put(key, {"run_static_analysis": result})
+    return result